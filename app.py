@@ -1,16 +1,25 @@
 import streamlit as st
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import lxml.html
+from lxml import etree
 import pandas as pd
+import xlsxwriter
 from datetime import datetime
 import io
-import time
+import codecs
+import re
+from urllib.parse import urlparse
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import threading
 
 # Page setup
 st.set_page_config(page_title="Article to Excel Extractor", layout="centered", page_icon="📄")
 
 # Custom CSS to make it look nice
-st.markdown("""
+CUSTOM_CSS = """
 <style>
     .stButton > button {
         width: 100%;
@@ -32,7 +41,11 @@ st.markdown("""
         margin: 10px 0;
     }
 </style>
-""", unsafe_allow_html=True)
+"""
+# Streamlit drops elements a rerun does not emit again, so the style block has to be
+# sent on every run; collapse its whitespace once here to keep that payload small
+CUSTOM_CSS = ' '.join(CUSTOM_CSS.split())
+st.markdown(CUSTOM_CSS, unsafe_allow_html=True)
 
 st.title("📄 Article to Excel Extractor")
 st.markdown("**Paste any article URL and download the content as an Excel file in one click**")
@@ -40,83 +53,254 @@ st.markdown("**Paste any article URL and download the content as an Excel file i
 # Create tabs for Single vs Batch
 tab1, tab2 = st.tabs(["📝 Single Article", "📚 Batch Download (Multiple URLs)"])
 
-def extract_article(url):
-    """Extract article data from URL"""
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    # br needs the brotli package, which lets urllib3 decode it transparently
+    'Accept-Encoding': 'gzip, deflate, br'
+}
+
+@st.cache_resource
+def get_session():
+    """Shared HTTP session so repeat requests to a host reuse the open connection"""
+    session = requests.Session()
+    session.headers.update(HEADERS)
+    adapter = HTTPAdapter(pool_connections=20, pool_maxsize=20, max_retries=Retry(total=2, backoff_factor=0.3))
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+SESSION = get_session()
+
+# Pages are cut off after this many bytes; article text is near the top and
+# anything bigger is boilerplate that would only bloat memory in batch mode
+MAX_PAGE_BYTES = 2_000_000
+CHUNK_SIZE = 65536
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Batch mode fetches in parallel, but never more than 2 pages at once per host
+BATCH_WORKERS = 8
+HOST_LIMITS = defaultdict(lambda: threading.Semaphore(2))
+HOST_LIMITS_LOCK = threading.Lock()
+
+def host_limit(url):
+    """Semaphore shared by every fetch to the URL's host"""
+    with HOST_LIMITS_LOCK:
+        return HOST_LIMITS[urlparse(url).netloc]
+
+def tidy_lines(text):
+    """Strip every line and drop the blank ones"""
+    # splitlines/strip stays linear on long whitespace runs, unlike a regex around the breaks
+    return '\n'.join(line.strip() for line in text.splitlines() if line.strip())
+
+# Anything that is not a letter, digit, space, hyphen or underscore is dropped from filenames
+UNSAFE_FILENAME_RE = re.compile(r'[^\w -]')
+
+# Candidate containers for the article text, most specific first
+ARTICLE_BODY_PATHS = (
+    '//article',
+    '//main',
+    "//div[contains(concat(' ', normalize-space(@class), ' '), ' content ')]",
+    "//div[contains(concat(' ', normalize-space(@class), ' '), ' post ')]",
+)
+UNWANTED_TAGS = ("script", "style", "nav", "footer", "header", "aside", "advertisement")
+
+# <meta charset=...> or <meta http-equiv=... content="...; charset=..."> near the top of the page
+META_CHARSET_RE = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?([\w.:-]+)', re.IGNORECASE)
+
+def is_utf8(content):
+    """True if the bytes decode as UTF-8, allowing a character cut off by MAX_PAGE_BYTES"""
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        
-        with st.spinner(f'Loading {url[:50]}...'):
-            response = requests.get(url, headers=headers, timeout=15)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Remove unwanted elements
-            for element in soup(["script", "style", "nav", "footer", "header", "aside", "advertisement"]):
-                element.decompose()
-            
-            # Extract title
-            title = "No title found"
-            if soup.title:
-                title = soup.title.string
-            elif soup.find('h1'):
-                title = soup.find('h1').get_text(strip=True)
-            
-            # Extract main content
-            article_body = soup.find('article') or soup.find('main') or soup.find('div', class_='content') or soup.find('div', class_='post')
-            
-            if article_body:
-                text = article_body.get_text(separator='\n', strip=True)
-            else:
-                # Fallback to body text
-                text = soup.get_text(separator='\n', strip=True)
-            
-            # Clean up text
-            lines = [line.strip() for line in text.splitlines() if line.strip()]
-            clean_text = '\n'.join(lines)
-            
-            # Get domain
-            domain = url.split('/')[2] if len(url.split('/')) > 2 else 'unknown'
-            
-            return {
-                'title': title,
-                'url': url,
-                'domain': domain,
-                'text': clean_text,
-                'word_count': len(clean_text.split()),
-                'date_extracted': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                'status': 'success'
-            }
-            
+        codecs.getincrementaldecoder('utf-8')().decode(content)
+    except UnicodeDecodeError:
+        return False
+    return True
+
+def detect_encoding(content, declared=None):
+    """Pick the page encoding from the BOM, the HTTP header or an early <meta>.
+
+    Undeclared pages that decode as UTF-8 are taken as UTF-8. Anything else
+    returns None so libxml2 can look for a <meta> further down the page.
+    """
+    if content.startswith(codecs.BOM_UTF8):
+        return 'utf-8'
+    if declared:
+        return declared
+    match = META_CHARSET_RE.search(content, 0, 2048)
+    if match:
+        return match.group(1).decode('ascii')
+    if is_utf8(content):
+        return 'utf-8'
+    return None
+
+def html_parser(content, encoding):
+    """New lxml parser per page: lxml parsers must not be shared between batch threads"""
+    try:
+        return lxml.html.HTMLParser(remove_comments=True, encoding=encoding)
+    except LookupError:
+        # Charset label lxml does not know; go by the bytes instead
+        return lxml.html.HTMLParser(remove_comments=True, encoding='utf-8' if is_utf8(content) else None)
+
+def parse_article(url, content, declared_encoding=None):
+    """Build the article record from raw HTML bytes"""
+    doc = lxml.html.document_fromstring(content, parser=html_parser(content, detect_encoding(content, declared_encoding)))
+    if doc.getroottree().docinfo.encoding == 'ISO-8859-1':
+        # Latin-1, whether declared or libxml2's default for undeclared pages, is read by
+        # browsers as its superset windows-1252, which also maps the 0x80-0x9F punctuation
+        doc = lxml.html.document_fromstring(content, parser=html_parser(content, 'windows-1252'))
+
+    # Remove unwanted elements
+    etree.strip_elements(doc, *UNWANTED_TAGS, with_tail=False)
+
+    # Extract title
+    title = "No title found"
+    title_element = doc.find('.//title')
+    if title_element is None:
+        title_element = doc.find('.//h1')
+    if title_element is not None:
+        title = title_element.text_content().strip()
+
+    # Extract main content
+    article_body = None
+    for path in ARTICLE_BODY_PATHS:
+        found = doc.xpath(path)
+        if found:
+            article_body = found[0]
+            break
+
+    # Fallback to body text
+    text = '\n'.join((article_body if article_body is not None else doc).itertext())
+
+    # Clean up text
+    clean_text = tidy_lines(text)
+
+    # Get domain
+    domain = urlparse(url).netloc or 'unknown'
+
+    return {
+        'title': title,
+        'url': url,
+        'domain': domain,
+        'text': clean_text,
+        'word_count': len(clean_text.split()),
+        'date_extracted': None,  # stamped by extract_article, outside the cache
+        'status': 'success'
+    }
+
+def failed_article(url, error, now, title='Error'):
+    """Build the record for a URL that could not be extracted"""
+    return {
+        'title': title,
+        'url': url,
+        'domain': 'error',
+        'text': str(error),
+        'word_count': 0,
+        'date_extracted': now,
+        'status': f'failed: {str(error)}'
+    }
+
+@st.cache_data(ttl=3600, max_entries=256, show_spinner=False)
+def fetch_article(url):
+    """Download and parse one article, raising on failure so errors are not cached"""
+    with host_limit(url), SESSION.get(url, timeout=15, stream=True) as response:
+        response.raise_for_status()
+        chunks, total = [], 0
+        for chunk in response.iter_content(CHUNK_SIZE):
+            chunks.append(chunk)
+            total += len(chunk)
+            if total >= MAX_PAGE_BYTES:
+                break
+        # response.encoding falls back to ISO-8859-1 when no charset is sent, so only trust an explicit one
+        declared = response.encoding if 'charset' in response.headers.get('Content-Type', '').lower() else None
+    return parse_article(url, b''.join(chunks), declared)
+
+def is_web_url(url):
+    """Check that the URL is an absolute http:// or https:// address"""
+    try:
+        parsed = urlparse(url)
+    except ValueError:
+        # e.g. an unclosed IPv6 bracket such as http://[abc/x
+        return False
+    return parsed.scheme in ('http', 'https') and bool(parsed.netloc)
+
+def extract_article(url, *, now=None):
+    """Extract article data from URL.
+
+    Makes no Streamlit UI calls, so batch mode can run it on worker threads;
+    spinners and progress updates belong to the caller on the script thread.
+    ``now`` is the date_extracted stamp; a batch passes one for all its URLs.
+    """
+    if now is None:
+        now = datetime.now().strftime(TIMESTAMP_FORMAT)
+    if not is_web_url(url):
+        return failed_article(url, 'Missing http:// or https://', now, title='Invalid URL')
+    try:
+        result = fetch_article(url)
     except Exception as e:
-        return {
-            'title': 'Error',
-            'url': url,
-            'domain': 'error',
-            'text': str(e),
-            'word_count': 0,
-            'date_extracted': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            'status': f'failed: {str(e)}'
-        }
-
-def create_excel_download(data, filename_prefix="Article"):
-    """Create Excel file for download"""
-    if isinstance(data, list):
-        df = pd.DataFrame(data)
-    else:
-        df = pd.DataFrame([data])
+        return failed_article(url, e, now)
+    result['date_extracted'] = now
+    return result
+
+# Excel column widths are capped; the article text always hits the cap, so it is never measured
+MAX_COLUMN_WIDTH = 50
+WIDE_COLUMNS = {'text'}
+
+# Keep URLs and titles starting with '=' as plain strings rather than hyperlinks/formulas
+WORKBOOK_OPTIONS = {'strings_to_urls': False, 'strings_to_formulas': False}
+
+# Excel refuses longer strings in a single cell
+EXCEL_CELL_LIMIT = 32767
+TRUNCATED_NOTE = '\n[truncated to fit the Excel cell limit]'
+
+def excel_value(value):
+    """Cut strings that are too long for one cell, marking the cut"""
+    if isinstance(value, str) and len(value) > EXCEL_CELL_LIMIT:
+        return value[:EXCEL_CELL_LIMIT - len(TRUNCATED_NOTE)] + TRUNCATED_NOTE
+    return value
+
+def write_sheet(workbook, columns, rows, widths):
+    """Write the header and data rows to the 'Extracted Content' sheet"""
+    worksheet = workbook.add_worksheet('Extracted Content')
+    for i, width in enumerate(widths):
+        worksheet.set_column(i, i, int(width))
+    
+    worksheet.write_row(0, 0, columns, workbook.add_format({'bold': True, 'border': 1}))
+    # Cell by cell: write_row gives up on the rest of the row after the first failing cell
+    for row, values in enumerate(rows, start=1):
+        for col, value in enumerate(values):
+            worksheet.write(row, col, excel_value(value))
+
+def create_excel_single(result):
+    """Create Excel file for one article, written straight from the result dict"""
+    widths = [
+        MAX_COLUMN_WIDTH if key in WIDE_COLUMNS else min(max(len(str(value)), len(key)) + 2, MAX_COLUMN_WIDTH)
+        for key, value in result.items()
+    ]
     
     output = io.BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        df.to_excel(writer, index=False, sheet_name='Extracted Content')
-        
-        # Auto-adjust column widths
-        worksheet = writer.sheets['Extracted Content']
-        for i, col in enumerate(df.columns):
-            max_length = max(df[col].astype(str).map(len).max(), len(col)) + 2
-            worksheet.column_dimensions[chr(65 + i)].width = min(max_length, 50)
+    workbook = xlsxwriter.Workbook(output, {**WORKBOOK_OPTIONS, 'in_memory': True})
+    write_sheet(workbook, list(result.keys()), [list(result.values())], widths)
+    workbook.close()
+    
+    return output.getvalue()
+
+def create_excel_batch(data):
+    """Create Excel file for a batch of articles (DataFrame or list of dicts)"""
+    df = data if isinstance(data, pd.DataFrame) else pd.DataFrame(data)
+    df = df.fillna('')
+    
+    # Auto-adjust column widths
+    widths = [
+        MAX_COLUMN_WIDTH if col in WIDE_COLUMNS else min(max(df[col].astype(str).str.len().max(), len(col)) + 2, MAX_COLUMN_WIDTH)
+        for col in df.columns
+    ]
+    
+    # Stream rows straight into the sheet; constant_memory flushes each row
+    # as soon as the next one starts instead of keeping every cell around
+    output = io.BytesIO()
+    workbook = xlsxwriter.Workbook(output, {**WORKBOOK_OPTIONS, 'constant_memory': True})
+    write_sheet(workbook, list(df.columns), df.itertuples(index=False, name=None), widths)
+    workbook.close()
     
     return output.getvalue()
 
@@ -141,10 +325,11 @@ with tab1:
             st.rerun()
     
     if extract_btn and url_input:
-        if not url_input.startswith(('http://', 'https://')):
+        if not is_web_url(url_input):
             st.error("⚠️ Please include http:// or https:// in the URL")
         else:
-            result = extract_article(url_input)
+            with st.spinner(f'Loading {url_input[:50]}...'):
+                result = extract_article(url_input)
             st.session_state.single_result = result
             
             if result['status'] == 'success':
@@ -165,11 +350,11 @@ with tab1:
                     st.write(result['text'][:1000] + "..." if len(result['text']) > 1000 else result['text'])
                 
                 # Download button
-                safe_title = "".join([c for c in result['title'][:20] if c.isalnum() or c in (' ', '-', '_')]).rstrip().replace(' ', '_')
+                safe_title = UNSAFE_FILENAME_RE.sub('', result['title'][:20]).rstrip().replace(' ', '_')
                 filename_prefix = "Article"
                 filename = f"{filename_prefix}_{safe_title}.xlsx"
                 
-                excel_data = create_excel_download(result)
+                excel_data = create_excel_single(result)
                 
                 st.download_button(
                     label=f"📥 Download Excel ({len(result['text'])} characters)",
@@ -203,30 +388,26 @@ with tab2:
         else:
             progress_bar = st.progress(0)
             status_text = st.empty()
-            results = []
+            results = [None] * len(urls)
+            status_text.text(f"Processing {len(urls)} URLs...")
+            started = datetime.now()
+            now = started.strftime(TIMESTAMP_FORMAT)
             
-            for i, url in enumerate(urls):
-                status_text.text(f"Processing {i+1} of {len(urls)}: {url[:50]}...")
-                
-                if not url.startswith(('http://', 'https://')):
-                    results.append({
-                        'url': url,
-                        'title': 'Invalid URL',
-                        'status': 'failed: Missing http:// or https://',
-                        'text': ''
-                    })
-                else:
-                    result = extract_article(url)
-                    results.append(result)
-                    time.sleep(0.5)  # Be nice to servers
-                
-                progress_bar.progress((i + 1) / len(urls))
+            with ThreadPoolExecutor(max_workers=BATCH_WORKERS) as executor:
+                futures = {executor.submit(extract_article, url, now=now): i for i, url in enumerate(urls)}
+                for done, future in enumerate(as_completed(futures), start=1):
+                    i = futures[future]
+                    results[i] = future.result()
+                    status_text.text(f"Processed {done} of {len(urls)}: {urls[i][:50]}...")
+                    progress_bar.progress(done / len(urls))
             
             status_text.empty()
             progress_bar.empty()
             
+            full_df = pd.DataFrame(results)
+            
             # Summary
-            successful = len([r for r in results if r['status'] == 'success'])
+            successful = int((full_df['status'] == 'success').sum())
             failed = len(results) - successful
             
             if successful == len(results):
@@ -236,18 +417,20 @@ with tab2:
             
             # Show results table
             with st.expander("View Results Summary"):
-                summary_df = pd.DataFrame([
-                    {'URL': r['url'][:50] + '...', 'Title': r['title'][:40], 'Status': r['status'], 'Words': r['word_count']} 
-                    for r in results
-                ])
+                summary_df = pd.DataFrame({
+                    'URL': full_df['url'].str.slice(0, 50) + '...',
+                    'Title': full_df['title'].str.slice(0, 40),
+                    'Status': full_df['status'],
+                    'Words': full_df['word_count']
+                })
                 st.dataframe(summary_df, use_container_width=True)
             
             # Download all
-            excel_data = create_excel_download(results, "Batch_Articles")
+            excel_data = create_excel_batch(full_df)
             st.download_button(
                 label=f"📥 Download All Articles Excel ({len(results)} rows)",
                 data=excel_data,
-                file_name=f"Batch_Articles_{datetime.now().strftime('%Y%m%d_%H%M')}.xlsx",
+                file_name=f"Batch_Articles_{started.strftime('%Y%m%d_%H%M')}.xlsx",
                 mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
                 use_container_width=True
             )
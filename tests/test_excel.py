@@ -0,0 +1,84 @@
+import io
+import os
+import re
+import sys
+import zipfile
+import xml.etree.ElementTree as ET
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import app  # noqa: E402  (runs the Streamlit script in bare mode)
+
+NS = {'x': 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'}
+
+
+def cell_text(node):
+    return ''.join(t.text or '' for t in node.iterfind('.//x:t', NS))
+
+
+def read_back(blob):
+    """Read the first sheet as rows of values straight from the xlsx XML"""
+    with zipfile.ZipFile(io.BytesIO(blob)) as xlsx:
+        names = xlsx.namelist()
+        shared = []
+        if 'xl/sharedStrings.xml' in names:
+            shared = [cell_text(si) for si in ET.fromstring(xlsx.read('xl/sharedStrings.xml')).iterfind('x:si', NS)]
+        sheet = ET.fromstring(xlsx.read('xl/worksheets/sheet1.xml'))
+
+    rows = []
+    for row in sheet.iterfind('.//x:sheetData/x:row', NS):
+        values = {}
+        for cell in row.iterfind('x:c', NS):
+            column = re.match(r'[A-Z]+', cell.get('r')).group()
+            kind = cell.get('t')
+            if cell.find('x:f', NS) is not None:
+                value = ('formula', cell.find('x:f', NS).text)
+            elif kind == 's':
+                value = shared[int(cell.find('x:v', NS).text)]
+            elif kind == 'inlineStr':
+                value = cell_text(cell)
+            elif kind == 'str':
+                value = cell.find('x:v', NS).text
+            else:
+                value = float(cell.find('x:v', NS).text)
+            values[column] = value
+        rows.append([values.get(chr(65 + i)) for i in range(max(len(values), 7))])
+    return rows
+
+
+def long_result():
+    return {
+        'title': '=Not a formula',
+        'url': 'https://example.com/' + 'a' * 2100,
+        'domain': 'example.com',
+        'text': 'word ' * 9000,
+        'word_count': 9000,
+        'date_extracted': '2026-01-01 00:00:00',
+        'status': 'success'
+    }
+
+
+@pytest.mark.parametrize('create', [
+    lambda result: app.create_excel_single(result),
+    lambda result: app.create_excel_batch([result]),
+], ids=['single', 'batch'])
+def test_long_cells_keep_the_whole_row(create):
+    result = long_result()
+    blob = create(result)
+    header, row = read_back(blob)
+
+    assert header == list(result.keys())
+    title, url, domain, text, word_count, date_extracted, status = row
+    assert title == result['title']
+    assert url == result['url']
+    assert domain == 'example.com'
+    assert len(text) == app.EXCEL_CELL_LIMIT
+    assert text.endswith(app.TRUNCATED_NOTE)
+    assert word_count == 9000
+    assert date_extracted == result['date_extracted']
+    assert status == 'success'
+
+    # The URL must stay a plain string, not a hyperlink
+    with zipfile.ZipFile(io.BytesIO(blob)) as xlsx:
+        assert b'<hyperlink' not in xlsx.read('xl/worksheets/sheet1.xml')
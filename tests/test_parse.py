@@ -0,0 +1,49 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import app  # noqa: E402  (runs the Streamlit script in bare mode)
+
+
+def test_text_is_cleaned_like_splitlines():
+    raw = ' first \r\n\r\n second\x0bthird \x0c\u2028 \n\tfourth  '
+    assert app.tidy_lines(raw) == 'first\nsecond\nthird\nfourth'
+
+
+def test_long_whitespace_run_is_cleaned_quickly():
+    # A cleanup that is quadratic in the run length would take minutes here
+    raw = 'a' + ' ' * 200000 + 'x' + '\xa0' * 200000 + '\n' + '\n \t' * 100000 + 'b'
+    start = time.perf_counter()
+    assert app.tidy_lines(raw) == 'a' + ' ' * 200000 + 'x\nb'
+    assert time.perf_counter() - start < 1
+
+
+def test_word_count_matches_split():
+    html = '<article><p>Hello  world.   Two</p><p>Line\ttwo&nbsp;x</p><p>tail</p></article>'.encode()
+    result = app.parse_article('https://example.com/a', html)
+    assert result['text'] == 'Hello  world.   Two\nLine\ttwo\xa0x\ntail'
+    assert result['word_count'] == 7
+
+
+def test_malformed_url_is_rejected_without_raising():
+    assert not app.is_web_url('http://[abc/x')
+    result = app.extract_article('http://[abc/x', now='2026-01-01 00:00:00')
+    assert result['title'] == 'Invalid URL'
+    assert result['status'] == 'failed: Missing http:// or https://'
+
+
+def test_page_without_charset_label_is_decoded():
+    latin1 = app.parse_article('https://example.com/a', '<p>naïve café</p>'.encode('latin-1'))
+    assert latin1['text'] == 'naïve café'
+    cp1252 = app.parse_article('https://example.com/a', '<p>“quoted” — café</p>'.encode('cp1252'))
+    assert cp1252['text'] == '“quoted” — café'
+    utf8 = app.parse_article('https://example.com/a', '<p>Привет, café</p>'.encode('utf-8'))
+    assert utf8['text'] == 'Привет, café'
+
+
+def test_late_meta_charset_is_honoured():
+    padding = '<head><title>t</title><style>' + 'x' * 3000 + '</style>'
+    html = padding + '<meta charset="windows-1251"></head><body><article><p>Привет мир</p></article></body>'
+    result = app.parse_article('https://example.com/a', html.encode('cp1251'))
+    assert result['text'] == 'Привет мир'